@@ -162,6 +162,8 @@ class LLMService:
     def update_rag_variables(self):
         all_indexed_docs = list(self.rag.embeddings.database.search("select id, text from txtai"))
         self.all_indexed_files = [doc['id'] for doc in all_indexed_docs]
+        # Sorted copy lets tree_tool bisect to a directory's entries
+        self.sorted_indexed_files = sorted(self.all_indexed_files)
         self.indexed_file_map = {doc['id']: doc['text'] for doc in all_indexed_docs}
     
     def update_weights(self):
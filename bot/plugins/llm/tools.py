@@ -3,6 +3,7 @@ This file contains the tools for the LLM.
 """
 
 import re
+import bisect
 import difflib
 from pathlib import Path
 import yaml
@@ -74,14 +75,16 @@ def tree_tool(self, llm_text: str):
             subdirs = set()
             files = []
             prefix = tree_dir + "/" if tree_dir else ""
-            for doc_id in self.all_indexed_files:
-                if doc_id.startswith(prefix):
-                    rest = doc_id[len(prefix):]
-                    if "/" in rest:
-                        subdir = rest.split("/")[0]
-                        subdirs.add(subdir)
-                    else:
-                        files.append(rest)
+            # Ids under prefix form one contiguous run of the sorted id list
+            lo = bisect.bisect_left(self.sorted_indexed_files, prefix)
+            hi = bisect.bisect_left(self.sorted_indexed_files, prefix + "\U0010ffff", lo)
+            for doc_id in self.sorted_indexed_files[lo:hi]:
+                rest = doc_id[len(prefix):]
+                if "/" in rest:
+                    subdir = rest.split("/")[0]
+                    subdirs.add(subdir)
+                else:
+                    files.append(rest)
             entries = [f"[DIR] {d}/" for d in sorted(subdirs)] + [f"      {f}" for f in sorted(files)]
             if entries:
                 meta_prompt += f"\n\nTREE: Listing for '{tree_dir}':\n" + "\n".join(entries)
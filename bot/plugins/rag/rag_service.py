@@ -11,6 +11,11 @@ from typing import List, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# File suffix -> dual embedding category; anything not listed is 'docs'
+SUFFIX_CATEGORY = {ext: 'code' for ext in ('.py', '.js', '.ts', '.cpp', '.java', '.go', '.rs', '.c', '.h', '.css', '.scss', '.jsx', '.tsx')}
+# Configuration files (structured data) and markdown (often contains code blocks) are mixed
+SUFFIX_CATEGORY.update({ext: 'mixed' for ext in ('.json', '.yaml', '.yml', '.toml', '.ini', '.md', '.rst', '.nb')})
+
 def get_file_type_category(doc_id: str) -> str:
     """
     Determine if file should be treated as code, mixed content, or documentation
@@ -22,29 +27,16 @@ def get_file_type_category(doc_id: str) -> str:
     Returns:
         'code', 'mixed', or 'docs'
     """
-    path = Path(doc_id)
-    
-    # Direct code files
-    code_extensions = {'.py', '.js', '.ts', '.cpp', '.java', '.go', '.rs', '.c', '.h', '.css', '.scss', '.jsx', '.tsx'}
-    if path.suffix in code_extensions:
-        return 'code'
-    
-    # Converted notebooks (mixed code + documentation) 
-    if '.nb' in path.suffixes or '.nb.txt' in str(path):
-        return 'mixed'
-    
-    # Configuration files (often contain structured data that benefits from code understanding)
-    config_extensions = {'.json', '.yaml', '.yml', '.toml', '.ini'}
-    if path.suffix in config_extensions:
-        return 'mixed'
-    
-    # Mixed content (markdown often contains code blocks)
-    mixed_extensions = {'.md', '.rst'}
-    if path.suffix in mixed_extensions:
+    # Converted notebooks (mixed code + documentation)
+    if doc_id.endswith('.nb.txt'):
         return 'mixed'
     
-    # Pure documentation
-    return 'docs'
+    # Suffix lookup without building a Path. A dot in a directory name gives a slice
+    # containing '/', which matches no table entry and so falls through to 'docs'
+    dot = doc_id.rfind('.')
+    if dot < 0:
+        return 'docs'
+    return SUFFIX_CATEGORY.get(doc_id[dot:], 'docs')
 
 class RAGService:
     """Service for retrieving relevant context from the knowledge base."""
@@ -80,6 +72,7 @@ class RAGService:
         self.code_embeddings = None     # Code-specific model (if dual embedding enabled)
         
         self.repo_config = None
+        self._github_url_cache = {}  # doc_id -> GitHub URL (or None)
         self._load_config()
         self._load_embeddings()
         self.model_weights_path = Path(os.environ.get("NANCY_BASE_DIR", ".")) / "config" / "model_weights.yaml"
@@ -95,6 +88,7 @@ class RAGService:
         except Exception as e:
             logger.error(f"Failed to load repository configuration: {e}")
             self.repo_config = {}
+        self._github_url_cache.clear()
     
     def _get_github_url(self, doc_id: str) -> Optional[str]:
         """
@@ -106,6 +100,15 @@ class RAGService:
         Returns:
             GitHub URL or None if not found
         """
+        # Called for every result, retrieval and cached-context file, often repeatedly
+        try:
+            return self._github_url_cache[doc_id]
+        except KeyError:
+            github_url = self._github_url_cache[doc_id] = self._build_github_url(doc_id)
+            return github_url
+    
+    def _build_github_url(self, doc_id: str) -> Optional[str]:
+        """Resolve a document ID to its GitHub blob URL using the repository config."""
         if not self.repo_config:
             return None
             
@@ -213,16 +216,23 @@ class RAGService:
             logger.error(f"Search failed: {e}")
             return []
     
+    def _search_candidates(self, query: str, pool_size: int) -> Tuple[List[Dict], Optional[List[Dict]]]:
+        """Run the embeddings searches: (general results, code results or None)."""
+        general_results = self.general_embeddings.search(query, pool_size)
+        code_results = None
+        if self.use_dual_embedding and self.code_embeddings:
+            code_results = self.code_embeddings.search(query, pool_size)
+        return general_results, code_results
+    
     def _single_embedding_search(self, query: str, limit: int) -> List[Dict[str, str]]:
         """Perform search with single embedding model (backward compatibility)."""
-        results = self.general_embeddings.search(query, limit * 50)
+        results, _ = self._search_candidates(query, limit * 50)
         return self._process_and_rank_results(results, limit, dual_scores=None)
     
     def _dual_embedding_search(self, query: str, limit: int) -> List[Dict[str, str]]:
         """Perform search with dual embedding models and merge results."""
         # Search both models with larger candidate pools for reweighting
-        general_results = self.general_embeddings.search(query, limit * 50)
-        code_results = self.code_embeddings.search(query, limit * 50)
+        general_results, code_results = self._search_candidates(query, limit * 50)
         
         # Create dictionaries for quick lookup
         general_scores = {r['id']: r for r in general_results}
@@ -258,8 +268,8 @@ class RAGService:
                 # Mixed content: equal weighting
                 dual_score = 0.5 * general_score + 0.5 * code_score
             else:
-                # Documentation: favor general model
-                dual_score = 0.8 * general_score + 0.2 * code_score
+                # Documentation: only indexed by the general model
+                dual_score = general_score
             
             # Create merged result
             merged_result = {
@@ -350,7 +360,10 @@ class RAGService:
             Formatted context string
         """
         results = self.search(query, limit=5)
-        
+        return self._format_context(results, max_chars)
+    
+    def _format_context(self, results: List[Dict], max_chars: int) -> str:
+        """Format search results as source-annotated context of at most max_chars."""
         if not results:
             return "No relevant information found."
         
@@ -398,7 +411,10 @@ class RAGService:
             List of dictionaries with 'id', 'text', 'score', and 'github_url' keys
         """
         results = self.search(query, limit)
-        
+        return self._to_ai_results(results)
+    
+    def _to_ai_results(self, results: List[Dict]) -> List[Dict[str, str]]:
+        """Attach GitHub URLs and scoring details to search results."""
         enhanced_results = []
         for result in results:
             github_url = self._get_github_url(result['id'])
@@ -426,41 +442,27 @@ class RAGService:
             Formatted context string with more detailed content
         """
         results = self.search(query, limit=2)  # Fewer results, more content each
+        return self._format_context(results, max_chars)
+    
+    def search_all(self, query: str, limit: int = 5, max_chars: int = 4000) -> Dict[str, object]:
+        """
+        Search once and build every view of the results from that single search.
         
-        if not results:
-            return "No relevant information found."
-        
-        context_parts = []
-        current_length = 0
-        
-        for result in results:
-            # Get GitHub URL for this document
-            github_url = self._get_github_url(result['id'])
-            
-            # Allow much more content per document
-            text = result['text']
-            
-            # Add document info with both source path and GitHub link
-            if github_url:
-                # Extract filename for link text
-                filename = result['id'].split('/')[-1]
-                doc_info = f"Source: {result['id']}\nGitHub URL: <{github_url}|{filename}>\n"
-            else:
-                doc_info = f"Source: {result['id']}\n"
-            
-            content = f"{text}\n\n"
-            
-            # Check if adding this would exceed max_chars
-            if current_length + len(doc_info) + len(content) > max_chars:
-                break
+        Args:
+            query: Search query
+            limit: Maximum number of results to return
+            max_chars: Maximum characters to include in context
             
-            context_parts.append(doc_info + content)
-            current_length += len(doc_info) + len(content)
-        
-        if not context_parts:
-            return "No relevant information found."
-        
-        return "".join(context_parts).strip()
+        Returns:
+            Dictionary with 'results', 'context' and 'ai_results' keys, as returned
+            by search(), get_context_for_query() and get_raw_results_for_ai()
+        """
+        results = self.search(query, limit)
+        return {
+            'results': results,
+            'context': self._format_context(results, max_chars),
+            'ai_results': self._to_ai_results(results),
+        }
     
     def is_available(self) -> bool:
         """Check if the RAG service is available and ready."""
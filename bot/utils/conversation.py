@@ -2,6 +2,7 @@
 Conversation Manager
 Handles conversation history and context management
 """
+import asyncio
 import logging
 import aiohttp
 from typing import Dict, Any, List, Optional
@@ -9,11 +10,55 @@ from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# Longest Retry-After we will wait out before giving up on a rate-limited request
+MAX_RETRY_AFTER = 10
+
 class ConversationManager:
     """Manages conversation history and context"""
     
     def __init__(self, slack_client):
         self.slack_client = slack_client
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared Slack API session, creating it on first use.
+        One session keeps connections to slack.com alive between requests
+        instead of paying a new TCP + TLS handshake for every history fetch.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=20, limit_per_host=10, keepalive_timeout=75, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Authorization": f"Bearer {self.slack_client.bot_token}"}
+            )
+        return self._session
+    
+    async def _slack_get(self, url: str, params: Dict[str, Any]):
+        """
+        GET a Slack Web API method, waiting out one rate-limit (HTTP 429) response.
+        
+        Returns:
+            (status, data) where data is the decoded JSON body, or None on HTTP errors
+        """
+        session = self._get_session()
+        for attempt in range(2):
+            async with session.get(url, params=params) as response:
+                if response.status == 429 and attempt == 0:
+                    retry_after = float(response.headers.get("Retry-After", 1))
+                    if retry_after <= MAX_RETRY_AFTER:
+                        logger.warning(f"Slack rate limited {url}; retrying in {retry_after:.0f}s")
+                        await asyncio.sleep(retry_after)
+                        continue
+                if response.status != 200:
+                    return response.status, None
+                return response.status, await response.json()
+    
+    async def close(self):
+        """Close the shared Slack API session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     def _is_context_block_message(self, text: str) -> bool:
         """
@@ -53,7 +98,6 @@ class ConversationManager:
         """
         try:
             url = "https://slack.com/api/conversations.history"
-            headers = {"Authorization": f"Bearer {self.slack_client.bot_token}"}
             
             params = {
                 "channel": channel_id,
@@ -67,54 +111,52 @@ class ConversationManager:
                 params["ts"] = thread_ts
                 params["limit"] = limit
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("ok"):
-                            messages = data.get("messages", [])
-                            # Sort by timestamp (oldest first) and format for context
-                            formatted_messages = []
-                            for msg in sorted(messages, key=lambda x: float(x.get("ts", 0))):
-                                # Skip system messages but keep bot messages (Nancy's responses)
-                                if msg.get("subtype") and msg.get("subtype") != "bot_message":
-                                    continue
-                                    
-                                user_id = msg.get("user", "Unknown")
-                                text = msg.get("text", "")
-                                ts = msg.get("ts", "")
-                                
-                                # Handle bot messages (Nancy's responses)
-                                if msg.get("bot_id"):
-                                    # Filter out context block messages (status updates)
-                                    # These are messages that start with emoji and have underscores (italics)
-                                    if self._is_context_block_message(text):
-                                        continue
-                                        
-                                    bot_profile = msg.get("bot_profile", {})
-                                    bot_name = bot_profile.get("name", "Nancy")
-                                    formatted_messages.append({
-                                        "user": f"Bot_{bot_name}",
-                                        "text": text,
-                                        "timestamp": ts,
-                                        "is_bot": True
-                                    })
-                                else:
-                                    # Regular user message
-                                    formatted_messages.append({
-                                        "user": user_id,
-                                        "text": text,
-                                        "timestamp": ts,
-                                        "is_bot": False
-                                    })
+            status, data = await self._slack_get(url, params)
+            if status == 200:
+                if data.get("ok"):
+                    messages = data.get("messages", [])
+                    # Sort by timestamp (oldest first) and format for context
+                    formatted_messages = []
+                    for msg in sorted(messages, key=lambda x: float(x.get("ts", 0))):
+                        # Skip system messages but keep bot messages (Nancy's responses)
+                        if msg.get("subtype") and msg.get("subtype") != "bot_message":
+                            continue
                             
-                            logger.info(f"Retrieved {len(formatted_messages)} conversation messages")
-                            return formatted_messages[-limit:]  # Return most recent N messages
+                        user_id = msg.get("user", "Unknown")
+                        text = msg.get("text", "")
+                        ts = msg.get("ts", "")
+                        
+                        # Handle bot messages (Nancy's responses)
+                        if msg.get("bot_id"):
+                            # Filter out context block messages (status updates)
+                            # These are messages that start with emoji and have underscores (italics)
+                            if self._is_context_block_message(text):
+                                continue
+                                
+                            bot_profile = msg.get("bot_profile", {})
+                            bot_name = bot_profile.get("name", "Nancy")
+                            formatted_messages.append({
+                                "user": f"Bot_{bot_name}",
+                                "text": text,
+                                "timestamp": ts,
+                                "is_bot": True
+                            })
                         else:
-                            logger.error(f"Slack API error: {data.get('error', 'Unknown error')}")
-                    else:
-                        logger.error(f"HTTP error {response.status} fetching conversation history")
-            
+                            # Regular user message
+                            formatted_messages.append({
+                                "user": user_id,
+                                "text": text,
+                                "timestamp": ts,
+                                "is_bot": False
+                            })
+                    
+                    logger.info(f"Retrieved {len(formatted_messages)} conversation messages")
+                    return formatted_messages[-limit:]  # Return most recent N messages
+                else:
+                    logger.error(f"Slack API error: {data.get('error', 'Unknown error')}")
+            else:
+                logger.error(f"HTTP error {status} fetching conversation history")
+    
         except Exception as e:
             logger.error(f"Error fetching conversation history: {e}", exc_info=True)
             
@@ -129,6 +129,10 @@ async def create_app() -> web.Application:
     app.router.add_post("/slack/events", bot.handle_event)
     app.router.add_post("/slack/interactive", bot.handle_interactive)
     
+    async def close_sessions(app: web.Application) -> None:
+        await bot.conversation_manager.close()
+    app.on_cleanup.append(close_sessions)
+    
     return app
 
 if __name__ == "__main__":
@@ -142,6 +146,15 @@ if __name__ == "__main__":
     )
     
     logger.info("Starting Nancy Bot...")
+    
+    # uvloop is a faster drop-in event loop for aiohttp; use it when installed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("Using uvloop event loop")
+    except ImportError:
+        pass
+    
     app = asyncio.run(create_app())
     logger.info("Nancy Bot ready on http://0.0.0.0:3000")
     web.run_app(app, host="0.0.0.0", port=3000)
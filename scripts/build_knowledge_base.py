@@ -4,6 +4,7 @@ Orchestrates the full knowledge base build pipeline (cloning, direct txtai index
 """
 
 import os
+import sys
 import yaml
 import subprocess
 from pathlib import Path
@@ -12,6 +13,12 @@ import argparse
 import json
 import requests
 import tempfile
+import hashlib
+import copy
+from collections import OrderedDict
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Add import for nb4llm
 try:
@@ -32,6 +39,97 @@ except ImportError:
 
 import shutil
 
+# Add project root to path so the bot's shared helpers can be imported
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Same code/mixed/docs split the bot uses when merging dual-embedding scores
+from bot.plugins.rag.rag_service import get_file_type_category
+
+# Text files larger than this are skipped (generated/minified data embeds poorly)
+MAX_TEXT_BYTES = 2_000_000
+
+# Embedding model for the general (always built) index
+GENERAL_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Texts per encoder forward pass (txtai's default is 32)
+ENCODE_BATCH_SIZE = 64
+
+# Threads used to delete raw repositories/PDFs in parallel during cleanup
+CLEANUP_WORKERS = 8
+
+# Records what the saved indices contain, so later builds can update them in place
+INDEX_MANIFEST = "manifest.json"
+
+# libyaml's C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+# Parsed YAML configs keyed by absolute path -> (mtime, size, data), most recent last
+_yaml_cache = OrderedDict()
+_YAML_CACHE_SIZE = 100
+
+def load_yaml_cached(path) -> dict:
+    """
+    Parse a YAML file, reusing the previous parse while the file is unchanged
+    
+    Args:
+        path: Path to the YAML file
+        
+    Returns:
+        dict: A private copy of the parsed document (callers may mutate it)
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+    cached = _yaml_cache.get(key)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        _yaml_cache.move_to_end(key)
+        return copy.deepcopy(cached[2])
+    
+    with open(key, "r") as f:
+        data = yaml.load(f, Loader=SafeLoader)
+    _yaml_cache[key] = (stat.st_mtime, stat.st_size, data)
+    _yaml_cache.move_to_end(key)
+    if len(_yaml_cache) > _YAML_CACHE_SIZE:
+        _yaml_cache.popitem(last=False)
+    return copy.deepcopy(data)
+
+@functools.cache
+def _get_fitz():
+    """Import PyMuPDF on first use, returning None if it is not installed"""
+    try:
+        import fitz
+    except ImportError:
+        logging.getLogger(__name__).debug("PyMuPDF (fitz) not available for PDF fallback")
+        return None
+    return fitz
+
+@functools.cache
+def _get_pdfplumber():
+    """Import pdfplumber on first use, returning None if it is not installed"""
+    try:
+        import pdfplumber
+    except ImportError:
+        logging.getLogger(__name__).debug("pdfplumber not available for PDF fallback")
+        return None
+    return pdfplumber
+
+@functools.cache
+def _get_pypdf2():
+    """Import PyPDF2 on first use, returning None if it is not installed"""
+    try:
+        import PyPDF2
+    except ImportError:
+        logging.getLogger(__name__).debug("PyPDF2 not available for PDF fallback")
+        return None
+    return PyPDF2
+
+def pdf_fallback_available() -> bool:
+    """Check for any fallback PDF library without paying for its import"""
+    return any(importlib.util.find_spec(name) is not None for name in ('fitz', 'pdfplumber', 'PyPDF2'))
+
 def extract_text_fallback(pdf_path):
     """
     Extract text from PDF using fallback methods when Tika fails
@@ -43,50 +141,89 @@ def extract_text_fallback(pdf_path):
         str: Extracted text or None if all methods fail
     """
     
-    # Try PyPDF2 first
-    try:
-        import PyPDF2
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+    # Try PyMuPDF (fitz) first - the most reliable extractor
+    fitz = _get_fitz()
+    if fitz is not None:
+        try:
+            doc = fitz.open(str(pdf_path))
             text = ""
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            for page in doc:
+                text += page.get_text() + "\n"
+            doc.close()
             if len(text.strip()) > 100:  # Minimum viable text
                 return text.strip()
-    except Exception:
-        pass
+        except Exception:
+            pass
     
     # Try pdfplumber
-    try:
-        import pdfplumber
-        text = ""
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        if len(text.strip()) > 100:
-            return text.strip()
-    except Exception:
-        pass
+    pdfplumber = _get_pdfplumber()
+    if pdfplumber is not None:
+        try:
+            text = ""
+            with pdfplumber.open(pdf_path) as pdf:
+                for page in pdf.pages:
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text + "\n"
+            if len(text.strip()) > 100:
+                return text.strip()
+        except Exception:
+            pass
     
-    # Try PyMuPDF (fitz)
-    try:
-        import fitz
-        doc = fitz.open(str(pdf_path))
-        text = ""
-        for page in doc:
-            text += page.get_text() + "\n"
-        doc.close()
-        if len(text.strip()) > 100:
-            return text.strip()
-    except Exception:
-        pass
+    # Try PyPDF2
+    PyPDF2 = _get_pypdf2()
+    if PyPDF2 is not None:
+        try:
+            with open(pdf_path, 'rb') as file:
+                reader = PyPDF2.PdfReader(file)
+                text = ""
+                for page in reader.pages:
+                    page_text = page.extract_text()
+                    if page_text:
+                        text += page_text + "\n"
+                if len(text.strip()) > 100:
+                    return text.strip()
+        except Exception:
+            pass
     
     return None
 
+def file_sha256(path) -> str:
+    """
+    Fingerprint a file without reading it into Python memory
+    
+    Args:
+        path: Path to the file
+        
+    Returns:
+        str: Hex SHA-256 digest of the file contents
+    """
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def hash_files(paths) -> dict:
+    """
+    Fingerprint several files concurrently (file_digest releases the GIL)
+    
+    Args:
+        paths: Iterable of file paths
+        
+    Returns:
+        dict: Mapping of path to hex SHA-256 digest, or to the OSError raised
+            for paths that could not be read (broken symlinks, permissions)
+    """
+    def digest_or_error(path):
+        try:
+            return file_sha256(path)
+        except OSError as e:
+            return e
+    
+    paths = list(paths)
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(paths), (os.cpu_count() or 1) * 2)) as executor:
+        return dict(zip(paths, executor.map(digest_or_error, paths)))
+
 def process_pdf_with_fallback(pdf_path, repo_info=None, article_info=None):
     """
     Process PDF with Tika first, then fallback methods
@@ -122,49 +259,12 @@ def process_pdf_with_fallback(pdf_path, repo_info=None, article_info=None):
         logger.warning(f"All PDF extraction methods failed for {pdf_path}")
         return None, False
 
-def get_file_type_category(doc_id: str) -> str:
-    """
-    Determine if file should be treated as code, mixed content, or documentation
-    for dual embedding model weighting.
-    
-    Args:
-        doc_id: Document identifier (path-like string)
-        
-    Returns:
-        'code', 'mixed', or 'docs'
-    """
-    path = Path(doc_id)
-    
-    # Direct code files
-    code_extensions = {'.py', '.js', '.ts', '.cpp', '.java', '.go', '.rs', '.c', '.h', '.css', '.scss', '.jsx', '.tsx'}
-    if path.suffix in code_extensions:
-        return 'code'
-    
-    # Converted notebooks (mixed code + documentation) 
-    if '.nb' in path.suffixes or '.nb.txt' in str(path):
-        return 'mixed'
-    
-    # Configuration files (often contain structured data that benefits from code understanding)
-    config_extensions = {'.json', '.yaml', '.yml', '.toml', '.ini'}
-    if path.suffix in config_extensions:
-        return 'mixed'
-    
-    # Mixed content (markdown often contains code blocks)
-    mixed_extensions = {'.md', '.rst'}
-    if path.suffix in mixed_extensions:
-        return 'mixed'
-    
-    # Pure documentation
-    return 'docs'
-
-
 def download_pdf_articles(config_path: str, base_path: str = "knowledge_base/raw", dry_run: bool = False, category: str = None, force_update: bool = False) -> dict:
     """Download PDF articles from URLs"""
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
 
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    config = load_yaml_cached(config_path)
 
     categories = [category] if category else list(config.keys())
     
@@ -175,6 +275,9 @@ def download_pdf_articles(config_path: str, base_path: str = "knowledge_base/raw
         'successful_downloads': []
     }
     
+    # One session so downloads from the same host reuse the connection
+    session = requests.Session()
+    
     for cat in categories:
         articles = config.get(cat)
         if not isinstance(articles, list):
@@ -202,29 +305,56 @@ def download_pdf_articles(config_path: str, base_path: str = "knowledge_base/raw
                 continue
                 
             dest_dir.mkdir(parents=True, exist_ok=True)
+            # Download to a side file so an interrupted run never leaves a truncated
+            # PDF at dest_file (which the exists() check above would then skip)
+            tmp_file = dest_file.with_suffix(".pdf.part")
             try:
-                response = requests.get(article_url, stream=True, timeout=30)
-                response.raise_for_status()
+                with session.get(article_url, stream=True, timeout=30) as response:
+                    response.raise_for_status()
+                    
+                    # Stream the socket straight into the file in 1 MiB blocks
+                    response.raw.decode_content = True
+                    with open(tmp_file, 'wb') as f:
+                        shutil.copyfileobj(response.raw, f, length=1 << 20)
+                    
+                    expected_size = response.headers.get('Content-Length')
+                    if expected_size and 'Content-Encoding' not in response.headers:
+                        actual_size = tmp_file.stat().st_size
+                        if actual_size != int(expected_size):
+                            raise IOError(f"Incomplete download: got {actual_size} of {expected_size} bytes")
                 
-                with open(dest_file, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                        
+                os.replace(tmp_file, dest_file)
                 logger.info(f"Successfully downloaded {article_name}")
                 failures['successful_downloads'].append(f"{cat}/{article_name}")
             except Exception as e:
+                tmp_file.unlink(missing_ok=True)
                 logger.error(f"Failed to download {article_name}: {e}")
                 failures['failed_downloads'].append(f"{cat}/{article_name}: {str(e)}")
 
+    session.close()
     return failures
 
 
+def run_git(*args) -> subprocess.CompletedProcess:
+    """
+    Run a git command, raising CalledProcessError (with captured stderr) on failure
+    
+    Args:
+        *args: Arguments passed to git
+        
+    Returns:
+        subprocess.CompletedProcess: The finished process
+    """
+    # Fail fast instead of hanging on credential prompts for private/missing repos
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    return subprocess.run(["git", *args], check=True, capture_output=True, text=True, env=env)
+
+
 def clone_repositories(config_path: str, base_path: str = "knowledge_base/raw", dry_run: bool = False, category: str = None, force_update: bool = False) -> dict:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
 
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    config = load_yaml_cached(config_path)
 
     categories = [category] if category else list(config.keys())
     
@@ -249,13 +379,14 @@ def clone_repositories(config_path: str, base_path: str = "knowledge_base/raw",
                 if force_update:
                     logger.info(f"Repository {cat}/{repo_name} exists. Updating...")
                     if dry_run:
-                        logger.info(f"[DRY RUN] Would update {cat}/{repo_name} (git fetch & pull)")
+                        logger.info(f"[DRY RUN] Would update {cat}/{repo_name} (shallow fetch & reset)")
                         continue
                     try:
-                        subprocess.run(["git", "fetch", "--all"], cwd=str(dest_dir), check=True, capture_output=True, text=True)
-                        result = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=str(dest_dir), capture_output=True, text=True)
-                        current_branch = result.stdout.strip()
-                        subprocess.run(["git", "pull", "origin", current_branch], cwd=str(dest_dir), check=True, capture_output=True, text=True)
+                        # Only the latest tree is indexed, so never fetch history. A
+                        # depth-1 `pull --ff-only` cannot fast-forward a shallow clone
+                        # (the new tip's parents are never fetched), hence fetch + reset.
+                        run_git("-C", str(dest_dir), "fetch", "--depth=1", "origin", "HEAD")
+                        run_git("-C", str(dest_dir), "reset", "--hard", "FETCH_HEAD")
                         logger.info(f"Successfully updated {repo_name}")
                         failures['successful_updates'].append(f"{cat}/{repo_name}")
                     except subprocess.CalledProcessError as e:
@@ -271,12 +402,8 @@ def clone_repositories(config_path: str, base_path: str = "knowledge_base/raw",
                     continue
                 dest_dir.parent.mkdir(parents=True, exist_ok=True)
                 try:
-                    subprocess.run(
-                        ["git", "clone", repo_url, str(dest_dir)],
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
+                    # Shallow, blobless clone: only HEAD's working tree feeds the indexer
+                    run_git("clone", "--depth=1", "--single-branch", "--filter=blob:none", repo_url, str(dest_dir))
                     logger.info(f"Successfully cloned {repo_name}")
                     failures['successful_clones'].append(f"{cat}/{repo_name}")
                 except subprocess.CalledProcessError as e:
@@ -286,7 +413,94 @@ def clone_repositories(config_path: str, base_path: str = "knowledge_base/raw",
     return failures
 
 
-def build_txtai_index(config_path: str, articles_config_path: str = None, base_path: str = "knowledge_base/raw", embeddings_path: str = "knowledge_base/embeddings", dry_run: bool = False, category: str = None) -> dict:
+# Extensions indexed as text, in the order their files are added to the index
+TEXT_SUFFIXES = ('.py', '.md', '.txt', '.rst', '.yaml', '.yml', '.json')
+
+# Directories never indexed; pruned while walking a repository
+SKIP_DIRS = {'.git', '.github', '__pycache__', 'node_modules', '.pytest_cache', '.mypy_cache'}
+
+def scan_repository(repo_dir: Path) -> dict:
+    """
+    Collect a repository's indexable files in a single directory walk
+    
+    Args:
+        repo_dir: Root of the cloned repository
+        
+    Returns:
+        dict: suffix -> list of Paths for each of TEXT_SUFFIXES, plus '.ipynb' and '.pdf'
+    """
+    found = {suffix: [] for suffix in TEXT_SUFFIXES + ('.ipynb', '.pdf')}
+    stack = [str(repo_dir)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                # d_type from the directory listing answers this without a stat call
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                    continue
+                files = found.get(os.path.splitext(entry.name)[1])
+                if files is not None:
+                    files.append(Path(entry.path))
+    return found
+
+
+def load_index_manifest(embeddings_dir: Path) -> dict:
+    """
+    Load the manifest written by the previous index build
+    
+    Args:
+        embeddings_dir: Directory holding the embeddings indices
+        
+    Returns:
+        dict: Manifest with model names and a doc_id -> content hash map, or {} if missing
+    """
+    try:
+        with open(embeddings_dir / INDEX_MANIFEST, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def update_embeddings_index(embeddings, index_path: Path, documents: list, previous_hashes: dict, current_hashes: dict, incremental: bool) -> bool:
+    """
+    Bring a saved txtai index in line with documents, embedding only what changed
+    
+    Args:
+        embeddings: txtai Embeddings instance configured with the target model
+        index_path: Where the index is (or will be) saved
+        documents: (doc_id, content) tuples the index should contain
+        previous_hashes: doc_id -> content hash from the last build, limited to the
+            documents this index holds that are being rebuilt (any other id is removed)
+        current_hashes: doc_id -> content hash for this build
+        incremental: Whether the existing index may be reused
+        
+    Returns:
+        bool: True if the saved index was updated in place, False if it was rebuilt
+    """
+    logger = logging.getLogger(__name__)
+    
+    if incremental and index_path.exists():
+        embeddings.load(str(index_path))
+        doc_ids = {doc_id for doc_id, _ in documents}
+        removed_ids = [doc_id for doc_id in previous_hashes if doc_id not in doc_ids]
+        changed_documents = [doc for doc in documents if previous_hashes.get(doc[0]) != current_hashes[doc[0]]]
+        
+        logger.info(f"Incremental update of {index_path}: {len(changed_documents)} new/changed, {len(removed_ids)} removed")
+        if removed_ids:
+            embeddings.delete(removed_ids)
+        if changed_documents:
+            embeddings.upsert(changed_documents)
+        reused = True
+    else:
+        embeddings.index(documents)
+        reused = False
+    
+    embeddings.save(str(index_path))
+    return reused
+
+
+def build_txtai_index(config_path: str, articles_config_path: str = None, base_path: str = "knowledge_base/raw", embeddings_path: str = "knowledge_base/embeddings", dry_run: bool = False, category: str = None, rebuild: bool = False) -> dict:
     """Build txtai embeddings index directly from raw files and PDFs"""
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
@@ -303,7 +517,8 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
             'successful_pdf_files': 0,
             'successful_notebook_conversions': 0,
             'skipped_repositories': [],
-            'skipped_articles': []
+            'skipped_articles': [],
+            'skipped_duplicates': []
         }
 
     # Check if dual embedding is enabled
@@ -316,20 +531,9 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
 
     # Initialize Tika for PDF processing with better error handling
     tika_ready = False
-    pdf_fallback_available = False
     
-    # Check for fallback PDF libraries
-    try:
-        import PyPDF2
-        pdf_fallback_available = True
-        logger.info("✅ PyPDF2 available as fallback")
-    except ImportError:
-        try:
-            import pdfplumber
-            pdf_fallback_available = True
-            logger.info("✅ pdfplumber available as fallback")
-        except ImportError:
-            pass
+    # Fallback PDF libraries are only imported if a fallback is actually needed
+    has_pdf_fallback = pdf_fallback_available()
     
     if TIKA_AVAILABLE and not os.environ.get("SKIP_PDF_PROCESSING", "").lower() == "true":
         try:
@@ -343,19 +547,17 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
             logger.info("✅ Tika VM initialized for PDF processing")
         except Exception as e:
             logger.warning(f"Failed to initialize Tika VM: {e}")
-            if pdf_fallback_available:
+            if has_pdf_fallback:
                 logger.info("Will use fallback PDF processing methods")
             else:
                 logger.warning("No PDF processing will be available")
 
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    config = load_yaml_cached(config_path)
 
     # Load articles config if provided
     articles_config = {}
     if articles_config_path and os.path.exists(articles_config_path):
-        with open(articles_config_path, "r") as f:
-            articles_config = yaml.safe_load(f)
+        articles_config = load_yaml_cached(articles_config_path)
         logger.info(f"Loaded articles configuration from {articles_config_path}")
 
     # Create embeddings directory
@@ -364,9 +566,10 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
 
     # Initialize txtai embeddings models
     general_embeddings = Embeddings({
-        "path": "sentence-transformers/all-MiniLM-L6-v2",
+        "path": GENERAL_EMBEDDING_MODEL,
         "content": True,
-        "backend": "faiss"
+        "backend": "faiss",
+        "encodebatch": ENCODE_BATCH_SIZE
     })
     
     code_embeddings = None
@@ -374,19 +577,36 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
         code_embeddings = Embeddings({
             "path": code_model,
             "content": True,
-            "backend": "faiss"
+            "backend": "faiss",
+            "encodebatch": ENCODE_BATCH_SIZE
         })
         logger.info(f"Initialized code embeddings with model: {code_model}")
 
     # Load extension weights from YAML
     try:
         with open("config/index_weights.yaml", "r") as f:
-            ext_weights = yaml.safe_load(f)
+            ext_weights = yaml.load(f, Loader=SafeLoader)
     except Exception:
         ext_weights = {}
 
     categories = [category] if category else list(config.keys())
     documents = []
+    # Content hash -> canonical doc_id, so identical files are only embedded once
+    seen_hashes = {}
+    # PDF file hash -> canonical doc_id, so identical PDFs are only extracted once
+    seen_pdf_hashes = {}
+    
+    def add_document(doc_id, content):
+        """Append a document unless identical content was already added"""
+        content_hash = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+        canonical_id = seen_hashes.get(content_hash)
+        if canonical_id is not None:
+            logger.debug(f"Skipping {doc_id}: duplicate of {canonical_id}")
+            failures['skipped_duplicates'].append(f"{doc_id} -> {canonical_id}")
+            return False
+        seen_hashes[content_hash] = doc_id
+        documents.append((doc_id, content))
+        return True
     
     # Track failures
     failures = {
@@ -397,7 +617,8 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
         'successful_pdf_files': 0,
         'successful_notebook_conversions': 0,
         'skipped_repositories': [],
-        'skipped_articles': []
+        'skipped_articles': [],
+        'skipped_duplicates': []
     }
     
     # Process repository files
@@ -420,9 +641,12 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
                 logger.info(f"[DRY RUN] Would process files in {repo_dir}")
                 continue
 
+            # One walk of the repository (skipping SKIP_DIRS) serves every file type below
+            repo_files = scan_repository(repo_dir)
+
             # --- nb4llm notebook conversion step ---
             if convert_ipynb_to_txt is not None:
-                for ipynb_file in repo_dir.rglob("*.ipynb"):
+                for ipynb_file in repo_files['.ipynb']:
                     # Use .nb.txt extension to preserve notebook identity
                     nb_txt_file = ipynb_file.with_suffix(".nb.txt")
                     # Only convert if .nb.txt does not exist or is older than .ipynb
@@ -439,32 +663,34 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
             # --- end nb4llm notebook conversion step ---
 
             # Collect all text files (excluding .ipynb - we only want the converted .nb.txt versions)
-            text_files = []
-            for ext in ['.py', '.md', '.txt', '.rst', '.yaml', '.yml', '.json']:
-                text_files.extend(repo_dir.rglob(f"*{ext}"))
+            text_files = [f for ext in TEXT_SUFFIXES for f in repo_files[ext]]
             
-            # Add .nb.txt files specifically (converted notebooks)
-            text_files.extend(repo_dir.rglob("*.nb.txt"))
+            # Add converted notebooks written after the walk above
+            listed = set(repo_files['.txt'])
+            text_files.extend(
+                nb_txt_file for nb_txt_file in (f.with_suffix(".nb.txt") for f in repo_files['.ipynb'])
+                if nb_txt_file not in listed and nb_txt_file.exists()
+            )
             
             # Collect PDF files from repositories if Tika is available
-            pdf_files = []
-            if tika_ready:
-                pdf_files.extend(repo_dir.rglob("*.pdf"))
-            
-            # Skip common directories for both text and PDF files
-            skip_dirs = {'.git', '.github', '__pycache__', 'node_modules', '.pytest_cache', '.mypy_cache'}
-            text_files = [f for f in text_files if not any(skip in f.parts for skip in skip_dirs)]
-            pdf_files = [f for f in pdf_files if not any(skip in f.parts for skip in skip_dirs)]
+            pdf_files = repo_files['.pdf'] if tika_ready else []
 
             # Skip Sphinx build files and .rst.txt artifacts
             text_files = [f for f in text_files if 'docs/build' not in str(f) and not str(f).endswith('.rst.txt')]
             
             for file_path in text_files:
                 try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    # Skip empty or oversized files before decoding anything
+                    size = file_path.stat().st_size
+                    if size == 0:
+                        continue
+                    if size > MAX_TEXT_BYTES:
+                        logger.debug(f"Skipping {file_path} ({size} bytes > {MAX_TEXT_BYTES})")
+                        continue
+                    
+                    content = file_path.read_bytes().decode('utf-8')
                     
-                    # Skip empty files
+                    # Skip whitespace-only files
                     if not content.strip():
                         continue
                     
@@ -472,32 +698,43 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
                     doc_id = f"{cat}/{repo_name}/{file_path.relative_to(repo_dir)}"
                     
                     # Add to documents list (no score)
-                    documents.append((doc_id, content))
-                    logger.debug(f"Added {doc_id} ({len(content)} chars)")
-                    failures['successful_text_files'] += 1
+                    if add_document(doc_id, content):
+                        logger.debug(f"Added {doc_id} ({len(content)} chars)")
+                        failures['successful_text_files'] += 1
                     
                 except Exception as e:
                     logger.warning(f"Error reading {file_path}: {e}")
                     failures['failed_text_files'].append(f"{file_path}: {str(e)}")
             
             # Process PDF files found in repository
+            pdf_hashes = hash_files(pdf_files)
             for pdf_path in pdf_files:
+                doc_id = f"{cat}/{repo_name}/{pdf_path.relative_to(repo_dir)}"
                 try:
+                    pdf_hash = pdf_hashes[pdf_path]
+                    if isinstance(pdf_hash, OSError):
+                        raise pdf_hash
+                    canonical_id = seen_pdf_hashes.get(pdf_hash, doc_id)
+                    if canonical_id != doc_id:
+                        logger.debug(f"Skipping PDF {doc_id}: duplicate of {canonical_id}")
+                        failures['skipped_duplicates'].append(f"{doc_id} -> {canonical_id}")
+                        continue
+                    
                     # Use new fallback processing
                     content, success = process_pdf_with_fallback(pdf_path, repo_info=repo)
                     
                     if success and content:
-                        # Create document ID
-                        doc_id = f"{cat}/{repo_name}/{pdf_path.relative_to(repo_dir)}"
+                        # Only a copy that extracted successfully can stand in for its duplicates
+                        seen_pdf_hashes[pdf_hash] = doc_id
                         
                         # Add metadata to content
                         metadata = f"Source: Repository PDF from {repo['url']}\nPath: {pdf_path.relative_to(repo_dir)}\nType: Repository Document\n\n"
                         full_content = metadata + content
                         
                         # Add to documents list
-                        documents.append((doc_id, full_content))
-                        logger.info(f"Added repository PDF {doc_id} ({len(content)} chars)")
-                        failures['successful_pdf_files'] += 1
+                        if add_document(doc_id, full_content):
+                            logger.info(f"Added repository PDF {doc_id} ({len(content)} chars)")
+                            failures['successful_pdf_files'] += 1
                     else:
                         logger.warning(f"Failed to extract meaningful text from repository PDF {pdf_path}")
                         failures['failed_pdf_files'].append(f"{pdf_path}: No meaningful text extracted")
@@ -527,23 +764,30 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
                 logger.info(f"[DRY RUN] Would process PDF {pdf_file}")
                 continue
 
-            if tika_ready or pdf_fallback_available:
+            if tika_ready or has_pdf_fallback:
+                doc_id = f"journal_articles/{cat}/{article_name}"
                 try:
+                    pdf_hash = file_sha256(pdf_file)
+                    canonical_id = seen_pdf_hashes.get(pdf_hash, doc_id)
+                    if canonical_id != doc_id:
+                        logger.debug(f"Skipping PDF {doc_id}: duplicate of {canonical_id}")
+                        failures['skipped_duplicates'].append(f"{doc_id} -> {canonical_id}")
+                        continue
+                    
                     # Use new fallback processing
                     content, success = process_pdf_with_fallback(pdf_file, article_info=article)
                     
                     if success and content:
-                        # Create document ID
-                        doc_id = f"journal_articles/{cat}/{article_name}"
+                        seen_pdf_hashes[pdf_hash] = doc_id
                         
                         # Add metadata to content
                         metadata = f"Title: {article['description']}\nSource: {article.get('url', 'Unknown')}\nType: Journal Article\n\n"
                         full_content = metadata + content
                         
                         # Add to documents list
-                        documents.append((doc_id, full_content))
-                        logger.info(f"Added PDF {doc_id} ({len(content)} chars)")
-                        failures['successful_pdf_files'] += 1
+                        if add_document(doc_id, full_content):
+                            logger.info(f"Added PDF {doc_id} ({len(content)} chars)")
+                            failures['successful_pdf_files'] += 1
                     else:
                         logger.warning(f"Failed to extract meaningful text from {pdf_file}")
                         failures['failed_pdf_files'].append(f"{pdf_file}: No meaningful text extracted")
@@ -558,19 +802,47 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
     if documents:
         logger.info(f"Indexing {len(documents)} documents...")
         if not dry_run:
+            # Reuse the saved indices when they were built with the same models,
+            # so only new/changed documents go through the transformers
+            manifest = {} if rebuild else load_index_manifest(embeddings_dir)
+            current_hashes = {doc_id: content_hash for content_hash, doc_id in seen_hashes.items()}
+            # A --category build only rebuilds that category; documents of other
+            # categories stay in the saved indices and in the manifest
+            def in_scope(doc_id):
+                return category is None or doc_id.startswith((f"{category}/", f"journal_articles/{category}/"))
+            previous_hashes = {doc_id: h for doc_id, h in manifest.get('documents', {}).items() if in_scope(doc_id)}
+            kept_hashes = {doc_id: h for doc_id, h in manifest.get('documents', {}).items() if not in_scope(doc_id)}
+            
             # Index with general embeddings (always)
             logger.info("Building general embeddings index...")
-            general_embeddings.index(documents)
-            general_embeddings.save(str(embeddings_dir / "index"))
+            all_reused = update_embeddings_index(
+                general_embeddings, embeddings_dir / "index", documents, previous_hashes, current_hashes,
+                incremental=manifest.get('general_model') == GENERAL_EMBEDDING_MODEL
+            )
             logger.info(f"Saved general embeddings index to {embeddings_dir / 'index'}")
             
-            # Index with code embeddings if dual embedding enabled
+            # Index with code embeddings if dual embedding enabled. The general index
+            # keeps every document (it backs single-model search and the RETRIEVE/TREE
+            # lookups), but pure documentation gains nothing from the code model.
             if use_dual_embedding and code_embeddings:
-                logger.info("Building code embeddings index...")
-                code_embeddings.index(documents)
-                code_embeddings.save(str(embeddings_dir / "code_index"))
+                code_documents = [doc for doc in documents if get_file_type_category(doc[0]) != 'docs']
+                # Documentation ids were never added to the code index, so don't delete them from it
+                previous_code_hashes = {doc_id: h for doc_id, h in previous_hashes.items() if get_file_type_category(doc_id) != 'docs'}
+                logger.info(f"Building code embeddings index ({len(code_documents)} code/mixed documents)...")
+                all_reused &= update_embeddings_index(
+                    code_embeddings, embeddings_dir / "code_index", code_documents, previous_code_hashes, current_hashes,
+                    incremental=manifest.get('code_model') == code_model
+                )
                 logger.info(f"Saved code embeddings index to {embeddings_dir / 'code_index'}")
             
+            with open(embeddings_dir / INDEX_MANIFEST, "w") as f:
+                json.dump({
+                    'general_model': GENERAL_EMBEDDING_MODEL,
+                    'code_model': code_model if use_dual_embedding else None,
+                    # Other categories' documents are only still indexed if no index was rebuilt from scratch
+                    'documents': {**kept_hashes, **current_hashes} if all_reused else current_hashes
+                }, f, indent=2)
+            
             # Test search on general model
             results = general_embeddings.search("function", 3)
             logger.info("Test search results (general model):")
@@ -589,7 +861,7 @@ def build_txtai_index(config_path: str, articles_config_path: str = None, base_p
     return failures
 
 
-def build_pipeline(config_path: str, articles_config_path: str = None, base_path: str = "knowledge_base/raw", embeddings_path: str = "knowledge_base/embeddings", dry_run: bool = False, category: str = None, force_update: bool = False, dirty: bool = False) -> None:
+def build_pipeline(config_path: str, articles_config_path: str = None, base_path: str = "knowledge_base/raw", embeddings_path: str = "knowledge_base/embeddings", dry_run: bool = False, category: str = None, force_update: bool = False, dirty: bool = False, rebuild: bool = False) -> None:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
     
@@ -612,15 +884,17 @@ def build_pipeline(config_path: str, articles_config_path: str = None, base_path
         logger.warning(f"Articles config file {articles_config_path} not found. Skipping PDF downloads.")
     
     # Build embeddings index including both repos and PDFs
-    indexing_failures = build_txtai_index(config_path, articles_config_path, base_path, embeddings_path, dry_run, category)
+    indexing_failures = build_txtai_index(config_path, articles_config_path, base_path, embeddings_path, dry_run, category, rebuild)
     all_failures['indexing'] = indexing_failures
     
     # Cleanup downloaded files
     if not dirty and not dry_run:
         logger.info("Cleaning up raw repositories and PDFs...")
-        cleanup_raw_repositories(config_path, base_path, category)
+        repo_config = load_yaml_cached(config_path)
+        cleanup_raw_repositories(repo_config, base_path, category)
         if articles_config_path and os.path.exists(articles_config_path):
-            cleanup_pdf_articles(articles_config_path, base_path, category)
+            articles_config = load_yaml_cached(articles_config_path)
+            cleanup_pdf_articles(articles_config, base_path, category)
     elif dry_run and not dirty:
         logger.info("[DRY RUN] Would clean up raw repositories and PDFs after processing")
     
@@ -710,6 +984,9 @@ def print_pipeline_summary(all_failures: dict, dry_run: bool = False) -> None:
             for article in indexing_failures['skipped_articles']:
                 logger.info(f"     - {article}")
         
+        if indexing_failures.get('skipped_duplicates'):
+            logger.info(f"  ⏭️  Skipped duplicate documents: {len(indexing_failures['skipped_duplicates'])}")
+        
         # Failures
         if indexing_failures.get('failed_text_files'):
             logger.info(f"  ❌ Failed to process text files: {len(indexing_failures['failed_text_files'])}")
@@ -745,49 +1022,78 @@ def print_pipeline_summary(all_failures: dict, dry_run: bool = False) -> None:
     logger.info("=" * 60)
 
 
-def cleanup_pdf_articles(articles_config_path: str, base_path: str = "knowledge_base/raw", category: str = None) -> None:
-    """Clean up downloaded PDF articles after embeddings are built"""
+def remove_empty_category_dirs(base_path: str) -> None:
+    """Remove category directories left empty under base_path"""
     logger = logging.getLogger(__name__)
     
-    with open(articles_config_path, "r") as f:
-        config = yaml.safe_load(f)
+    if not os.path.isdir(base_path):
+        return
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            with os.scandir(entry.path) as children:
+                if next(children, None) is not None:
+                    continue
+            try:
+                os.rmdir(entry.path)
+                logger.info(f"Cleaned up empty category directory: {entry.path}")
+            except Exception as e:
+                logger.warning(f"Failed to clean up empty category directory {entry.path}: {e}")
+
+
+def cleanup_pdf_articles(config: dict, base_path: str = "knowledge_base/raw", category: str = None) -> None:
+    """
+    Clean up downloaded PDF articles after embeddings are built
+    
+    Args:
+        config: Parsed articles configuration
+        base_path: Base path the PDFs were downloaded to
+        category: Only clean up this category
+    """
+    logger = logging.getLogger(__name__)
     
     categories = [category] if category else list(config.keys())
+    to_delete = []
     for cat in categories:
         articles = config.get(cat)
         if not isinstance(articles, list):
             continue
         for article in articles:
             article_name = article["name"]
-            pdf_file = Path(base_path) / cat / f"{article_name}.pdf"
-            
-            if pdf_file.exists():
-                try:
-                    pdf_file.unlink()
-                    logger.info(f"Cleaned up PDF {cat}/{article_name}.pdf")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up PDF {cat}/{article_name}.pdf: {e}")
+            pdf_file = os.path.join(base_path, cat, f"{article_name}.pdf")
+            to_delete.append((f"{cat}/{article_name}.pdf", pdf_file))
+    
+    # Deletions are independent, so overlap their syscalls. Unlink without a
+    # prior exists() check: a missing file costs one failed syscall, not two.
+    with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as executor:
+        futures = {executor.submit(os.unlink, pdf_file): name for name, pdf_file in to_delete}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                logger.info(f"Cleaned up PDF {futures[future]}")
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to clean up PDF {futures[future]}: {e}")
     
     # Clean up empty category directories
-    base_path_obj = Path(base_path)
-    if base_path_obj.exists():
-        for cat_dir in base_path_obj.iterdir():
-            if cat_dir.is_dir() and not any(cat_dir.iterdir()):
-                try:
-                    cat_dir.rmdir()
-                    logger.info(f"Cleaned up empty category directory: {cat_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up empty category directory {cat_dir}: {e}")
+    remove_empty_category_dirs(base_path)
 
 
-def cleanup_raw_repositories(config_path: str, base_path: str = "knowledge_base/raw", category: str = None) -> None:
-    """Clean up raw repositories after embeddings are built"""
-    logger = logging.getLogger(__name__)
+def cleanup_raw_repositories(config: dict, base_path: str = "knowledge_base/raw", category: str = None) -> None:
+    """
+    Clean up raw repositories after embeddings are built
     
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
+    Args:
+        config: Parsed repository configuration
+        base_path: Base path the repositories were cloned to
+        category: Only clean up this category
+    """
+    logger = logging.getLogger(__name__)
     
     categories = [category] if category else list(config.keys())
+    to_delete = []
     for cat in categories:
         repos = config.get(cat)
         if not isinstance(repos, list):
@@ -797,25 +1103,23 @@ def cleanup_raw_repositories(config_path: str, base_path: str = "knowledge_base/
             repo_dir = Path(base_path) / cat / repo_name
             
             if repo_dir.exists():
-                try:
-                    import shutil
-                    shutil.rmtree(repo_dir)
-                    logger.info(f"Cleaned up {cat}/{repo_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up {cat}/{repo_name}: {e}")
+                to_delete.append((f"{cat}/{repo_name}", repo_dir))
+    
+    # Each tree is independent, so remove them concurrently
+    with ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as executor:
+        futures = {executor.submit(shutil.rmtree, repo_dir): name for name, repo_dir in to_delete}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                logger.info(f"Cleaned up {futures[future]}")
+            except Exception as e:
+                logger.warning(f"Failed to clean up {futures[future]}: {e}")
     
     # Clean up empty category directories
-    base_path_obj = Path(base_path)
-    if base_path_obj.exists():
-        for cat_dir in base_path_obj.iterdir():
-            if cat_dir.is_dir() and not any(cat_dir.iterdir()):
-                try:
-                    cat_dir.rmdir()
-                    logger.info(f"Cleaned up empty category directory: {cat_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed to clean up empty category directory {cat_dir}: {e}")
+    remove_empty_category_dirs(base_path)
 
-if __name__ == "__main__":
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command-line argument parser"""
     parser = argparse.ArgumentParser(description="Build the knowledge base by cloning repositories, downloading PDFs, and creating txtai embeddings.")
     parser.add_argument("--config", default="config/repositories.yml", help="Path to repository configuration file")
     parser.add_argument("--articles-config", default="config/articles.yml", help="Path to PDF articles configuration file")
@@ -825,8 +1129,20 @@ if __name__ == "__main__":
     parser.add_argument("--category", help="Process only a specific category")
     parser.add_argument("--force-update", action="store_true", help="Update repositories and re-download PDFs if they already exist")
     parser.add_argument("--dirty", action="store_true", help="Leave the raw repos and PDFs in place after embeddings are built")
+    parser.add_argument("--rebuild", action="store_true", help="Re-embed every document instead of updating the existing indices")
+    return parser
 
-    args = parser.parse_args()
+def main(argv: list = None) -> int:
+    """
+    Command-line entry point
+    
+    Args:
+        argv: Command-line arguments (defaults to sys.argv[1:])
+        
+    Returns:
+        int: Process exit status
+    """
+    args = build_parser().parse_args(argv)
 
     build_pipeline(
         config_path=args.config,
@@ -836,5 +1152,10 @@ if __name__ == "__main__":
         dry_run=args.dry_run,
         category=args.category,
         force_update=args.force_update,
-        dirty=args.dirty
+        dirty=args.dirty,
+        rebuild=args.rebuild
     )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # demo_query.py
 import sys
+import argparse
 import requests
 import os
 from pathlib import Path
@@ -9,10 +10,41 @@ import re
 from bot.plugins.rag.rag_service import get_rag_service
 import yaml
 import difflib
-
-debug = False
-
-query = " ".join(sys.argv[1:]) or "submission validation"
+import functools
+import heapq
+
+# Optional faster JSON encoder for the debug payload dumps
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# libyaml's C loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+# Tool calls in an LLM turn, e.g. [RETRIEVE: path] or [AWAIT], matched in one pass
+TOOL_RE = re.compile(r"\[(RETRIEVE|WEIGHT|TREE|SEARCH|AWAIT|BEGIN RESPONSE)(?::\s*([^\]\n]+))?\]")
+RESPONSE_RE = re.compile(r"\[BEGIN RESPONSE\](.*?)\[END RESPONSE\]", re.DOTALL)
+SEARCH_LIMIT_RE = re.compile(r"\s+limit\s+(\d+)\s*$", re.IGNORECASE)
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+parser = argparse.ArgumentParser(description="Run a query through the RAG + Gemini tool loop.")
+parser.add_argument("query", nargs="*", help="Question to ask (default: 'submission validation')")
+parser.add_argument("--history-turns", type=positive_int, default=3, help="Number of previous turns (at least 1, so the current one is kept) resent to the LLM alongside the initial prompt")
+parser.add_argument("--debug", action="store_true", help="Print score breakdowns and LLM responses, and dump each payload to tests/payload_<turn>.json")
+args = parser.parse_args()
+debug = args.debug
+
+query = " ".join(args.query) or "submission validation"
 rag = get_rag_service()
 if not rag.is_available():
     print("RAG service not available. Build the knowledge base first.\n")
@@ -111,14 +143,15 @@ Guidlines:
 # prompt the LLM (Gemini) API with the system prompt, query and results
 
 # Format the context from the results
-context = ""
+context_parts = []
 for i, result in enumerate(results, 1):
     github_url = rag._get_github_url(result['id'])
     if github_url:
         slack_link = f"<{github_url}|{Path(result['id']).name}>"
-        context += f"Result {i}:\nFile: {result['id']} ({slack_link})\nScore: {result['score']:.3f}\nContent:\n{result['text']}\n\n"
+        context_parts.append(f"Result {i}:\nFile: {result['id']} ({slack_link})\nScore: {result['score']:.3f}\nContent:\n{result['text']}\n\n")
     else:
-        context += f"Result {i}:\nFile: {result['id']}\nScore: {result['score']:.3f}\nContent:\n{result['text']}\n\n"
+        context_parts.append(f"Result {i}:\nFile: {result['id']}\nScore: {result['score']:.3f}\nContent:\n{result['text']}\n\n")
+context = "".join(context_parts)
 
 # Track files already included in the context window
 context_files = set(result['id'] for result in results)
@@ -128,10 +161,51 @@ max_turns = 5
 turn = 0
 llm_responses = []
 
-# Build a list of all indexed file paths from the embeddings database (once)
-all_indexed_docs = list(rag.embeddings.database.search("select id, text from txtai"))
-all_indexed_files = [doc['id'] for doc in all_indexed_docs]
-indexed_file_map = {doc['id']: doc['text'] for doc in all_indexed_docs}
+# Build a list of all indexed file paths from the embeddings database (once).
+# Only ids are loaded up front; text is fetched per file when RETRIEVE asks for it.
+all_indexed_files = [doc['id'] for doc in rag.embeddings.database.search("select id from txtai")]
+indexed_file_set = set(all_indexed_files)
+
+@functools.lru_cache(maxsize=64)
+def get_indexed_text(doc_id):
+    """Fetch the indexed text for a single document id"""
+    rows = rag.embeddings.database.search("select id, text from txtai where id = :p", parameters={"p": doc_id})
+    return "\n\n".join(row['text'] for row in rows)
+
+def trigrams(text):
+    """Set of overlapping 3-character substrings"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+@functools.cache
+def get_path_trigrams():
+    """Trigram sets for every indexed path, built on the first failed RETRIEVE"""
+    return [(doc_id, trigrams(doc_id)) for doc_id in all_indexed_files]
+
+@functools.cache
+def get_tree_root():
+    """Nested dict of indexed paths (directories map to dicts, files to None)"""
+    tree_root = {}
+    for doc_id in all_indexed_files:
+        node = tree_root
+        *dirs, filename = doc_id.split("/")
+        for part in dirs:
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            node = child
+        node.setdefault(filename, None)
+    return tree_root
+
+def suggest_similar_files(file_path, n=5):
+    """Shortlist paths by trigram overlap, then rank only those with difflib"""
+    query_trigrams = trigrams(file_path)
+    if query_trigrams:
+        scored = ((len(query_trigrams & path_trigrams) / len(query_trigrams | path_trigrams), doc_id)
+                  for doc_id, path_trigrams in get_path_trigrams())
+        candidates = [doc_id for _, doc_id in heapq.nlargest(50, scored)]
+    else:
+        candidates = all_indexed_files
+    return difflib.get_close_matches(file_path, candidates, n=n, cutoff=0.6)
 
 # Compose the full prompt
 full_prompt = f"""{system_prompt}
@@ -155,27 +229,51 @@ model_weights_path = Path("config/model_weights.yaml")
 # Load model weights
 if model_weights_path.exists():
     with open(model_weights_path, "r") as f:
-        model_weights = yaml.safe_load(f) or {}
+        model_weights = yaml.load(f, Loader=SafeLoader) or {}
 else:
     model_weights = {}
 
+# WEIGHT calls are appended to a journal during the session and folded into the
+# YAML once at the end; replay anything left behind by an interrupted session
+weights_journal_path = Path("config/model_weights.journal.jsonl")
+if weights_journal_path.exists():
+    with open(weights_journal_path, "r") as f:
+        for line in f:
+            if line.strip():
+                model_weights.update(json.loads(line))
+    rag.model_weights = model_weights
+weights_journal = open(weights_journal_path, "a")
+
 payload = {
     "contents": [
         {"role": "user", "parts": [{"text": full_prompt}]}
     ]
 }
 
+# Reuse one connection (and TLS session) for every turn
+session = requests.Session()
+session.headers.update(headers)
+
+# Bound once: the tool handlers below call these for every request in every turn
+db_search = rag.embeddings.database.search
+rag_search = rag.search
+get_gh = rag._get_github_url
+
 while searching and turn < max_turns:
 
-    response = requests.post(
-        f"{GEMINI_API_URL}?key={GEMINI_API_KEY}",
-        headers=headers,
+    response = session.post(
+        GEMINI_API_URL,
+        params={"key": GEMINI_API_KEY},
         json=payload
     )
 
     #save payload to file for debugging
-    with open(f"tests/payload_{turn}.json", "w") as f:
-        json.dump(payload, f)
+    if debug:
+        with open(f"tests/payload_{turn}.json", "wb") as f:
+            if orjson is not None:
+                f.write(orjson.dumps(payload))
+            else:
+                f.write(json.dumps(payload).encode("utf-8"))
 
     if response.ok:
         data = response.json()
@@ -188,18 +286,19 @@ while searching and turn < max_turns:
         print("Error:", response.text)
         break
 
-    meta_prompt = f"\n\nTURN {turn+1} REQUESTS:\n\n"
+    # Tool output for the next turn, joined once all handlers have run
+    meta_parts = [f"\n\nTURN {turn+1} REQUESTS:\n\n"]
+
+    # Collect every tool call's arguments, grouped by tool, in one regex pass
+    tool_calls = {"RETRIEVE": [], "WEIGHT": [], "TREE": [], "SEARCH": [], "AWAIT": [], "BEGIN RESPONSE": []}
+    for tool_match in TOOL_RE.finditer(llm_text):
+        tool_calls[tool_match.group(1)].append((tool_match.group(2) or "").strip())
 
     # RETRIEVE tool handler
     # Extract the file path(s) from the LLM response
-    file_paths = []
-    if "RETRIEVE:" in llm_text:
-        # Support multiple RETRIEVE: lines
-        lines = llm_text.splitlines()
-        for line in lines:
-            if "RETRIEVE:" in line:
-                path = line.split("RETRIEVE:")[1].strip().split()[0].rstrip("]")
-                file_paths.append(path)
+    # (dict.fromkeys drops repeated paths while keeping the LLM's order)
+    file_paths = list(dict.fromkeys(tool_calls["RETRIEVE"]))
+    if file_paths:
         print(f"\nRetrieving files: {file_paths}")
 
         # Try to retrieve the file content for each file
@@ -210,156 +309,156 @@ while searching and turn < max_turns:
                     print(f"\nSkipping duplicate file retrieval for '{file_path}' (already in context)")
                     continue
                 # Exact match in indexed files
-                matching_chunks = [doc_id for doc_id in all_indexed_files if doc_id == file_path]
-                if matching_chunks:
+                if file_path in indexed_file_set:
                     if debug:
-                        print(f"Found {len(matching_chunks)} matching indexed chunks for '{file_path}':")
-                    for chunk_id in matching_chunks:
-                        if debug:
-                            print(f"  - {chunk_id}")
-                    file_content = "\n\n".join(indexed_file_map[chunk_id] for chunk_id in matching_chunks)
+                        print(f"Found indexed document for '{file_path}'")
+                    file_content = get_indexed_text(file_path)
                     # No character limit: send full file content
-                    github_url = rag._get_github_url(matching_chunks[0])
+                    github_url = get_gh(file_path)
                     if github_url:
-                        slack_link = f"<{github_url}|{Path(matching_chunks[0]).name}>"
-                        meta_prompt += f"\n\nGitHub URL: {slack_link}"
+                        slack_link = f"<{github_url}|{Path(file_path).name}>"
+                        meta_parts.append(f"\n\nGitHub URL: {slack_link}")
                     if debug:
                         print(f"file_content: {file_content[:500]}...")
                     # Add to context_files to prevent future duplicates
-                    context_files.update(matching_chunks)
+                    context_files.add(file_path)
                 else:
                     # Suggest similar indexed files
-                    suggestions = difflib.get_close_matches(file_path, all_indexed_files, n=5, cutoff=0.6)
+                    suggestions = suggest_similar_files(file_path)
                     if suggestions:
-                        meta_prompt += f"\n\nDid you mean: {', '.join(suggestions)}"
+                        meta_parts.append(f"\n\nDid you mean: {', '.join(suggestions)}")
                     file_content = f"[File not found in index. Searched: {file_path}]"
                     if debug:
                         print(f"File content: {file_content[:500]}...")
-                meta_prompt += f"\n\nRetrieved file: {file_path}\nFile content:\n{file_content}"
+                meta_parts.append(f"\n\nRetrieved file: {file_path}\nFile content:\n{file_content}")
             except Exception as e:
                 print(f"Error retrieving file: {e}")
                 searching = False
 
     # WEIGHT tool handler
-    if "WEIGHT:" in llm_text:
-        lines = llm_text.splitlines()
-        meta_prompt += f"\n\nModel reweighting:"
-        for line in lines:
-            if "WEIGHT:" in line:
-                path = line.split("WEIGHT:")[1].strip().split()[0].rstrip("]")
-                score_str = line.split("WEIGHT:")[1].strip().split()[1].rstrip("]")
-                score_multiplier = float(score_str)
-                print(f"\nWeighting file: {path} with multiplier: {score_multiplier}")
-                model_weights[path] = score_multiplier
-                meta_prompt += f"\nWeighting file: {path} with multiplier: {score_multiplier}"
-        with open(model_weights_path, "w") as f:
-            yaml.safe_dump(model_weights, f)
+    if tool_calls["WEIGHT"]:
+        meta_parts.append(f"\n\nModel reweighting:")
+        for weight_args in tool_calls["WEIGHT"]:
+            # [WEIGHT: <file_path>, <score_multiplier>]
+            path, _, score_str = weight_args.rpartition(",")
+            if not path:
+                path, _, score_str = weight_args.rpartition(" ")
+            path = path.strip()
+            score_multiplier = float(score_str)
+            print(f"\nWeighting file: {path} with multiplier: {score_multiplier}")
+            model_weights[path] = score_multiplier
+            weights_journal.write(json.dumps({path: score_multiplier}) + "\n")
+            meta_parts.append(f"\nWeighting file: {path} with multiplier: {score_multiplier}")
+        weights_journal.flush()
         # Reload weights in RAG service for next turn
         rag.model_weights = model_weights
 
     # TREE tool handler
-    if "TREE:" in llm_text:
-        lines = llm_text.splitlines()
-        for line in lines:
-            if "TREE:" in line:
-                tree_dir = line.split("TREE:")[1].strip().split()[0].rstrip("]")
-                # Build virtual tree from indexed files
-                tree_dir = tree_dir.rstrip("/")
-                subdirs = set()
-                files = []
-                prefix = tree_dir + "/" if tree_dir else ""
-                for doc_id in all_indexed_files:
-                    if doc_id.startswith(prefix):
-                        rest = doc_id[len(prefix):]
-                        if "/" in rest:
-                            subdir = rest.split("/")[0]
-                            subdirs.add(subdir)
-                        else:
-                            files.append(rest)
-                entries = [f"[DIR] {d}/" for d in sorted(subdirs)] + [f"      {f}" for f in sorted(files)]
-                if entries:
-                    meta_prompt += f"\n\nTREE: Listing for '{tree_dir}':\n" + "\n".join(entries)
-                    print(f"\nTREE: Listing for '{tree_dir}':\n" + "\n".join(entries))
-                else:
-                    meta_prompt += f"\n\nTREE: Directory '{tree_dir}' not found or empty in index."
-                    print(f"\nTREE: Directory '{tree_dir}' not found or empty in index.")
+    if tool_calls["TREE"]:
+        for tree_dir in tool_calls["TREE"]:
+            # Walk the virtual tree of indexed files down to tree_dir
+            tree_dir = tree_dir.rstrip("/")
+            node = get_tree_root()
+            for part in (tree_dir.split("/") if tree_dir else []):
+                node = node.get(part)
+                if not isinstance(node, dict):
+                    node = {}
+                    break
+            subdirs = sorted(name for name, child in node.items() if child is not None)
+            files = sorted(name for name, child in node.items() if child is None)
+            entries = [f"[DIR] {d}/" for d in subdirs] + [f"      {f}" for f in files]
+            if entries:
+                meta_parts.append(f"\n\nTREE: Listing for '{tree_dir}':\n" + "\n".join(entries))
+                print(f"\nTREE: Listing for '{tree_dir}':\n" + "\n".join(entries))
+            else:
+                meta_parts.append(f"\n\nTREE: Directory '{tree_dir}' not found or empty in index.")
+                print(f"\nTREE: Directory '{tree_dir}' not found or empty in index.")
 
     # SEARCH tool handler
     # Perform a new search if the assistant has requested it
-    if "SEARCH:" in llm_text:
-        lines = llm_text.splitlines()
-        for line in lines:
-            if "SEARCH:" in line:
-                search_content = line.split("SEARCH:")[1].strip()
-                raw_query = search_content
-                if raw_query.lower().startswith('select'):
-                    query_part = raw_query
-                    print(f"\nNew search (SQL): {query_part}")
-                    results = list(rag.embeddings.database.search(query_part))
+    if tool_calls["SEARCH"]:
+        for raw_query in tool_calls["SEARCH"]:
+            if raw_query.lower().startswith('select'):
+                query_part = raw_query
+                print(f"\nNew search (SQL): {query_part}")
+                results = list(db_search(query_part))
+            else:
+                # For natural language queries, expect format: <query> limit N
+                limit_match = SEARCH_LIMIT_RE.search(raw_query)
+                llm_search_max_results = int(limit_match.group(1)) if limit_match else 5
+                # Remove the trailing ' limit N' from the end
+                query_part = raw_query[:limit_match.start()] if limit_match else raw_query
+                print(f"\nNew search (NL): {query_part} (limit {llm_search_max_results})")
+                results = rag_search(query_part, limit=llm_search_max_results)
+
+            # Print the new results with score breakdown
+            for i, result in enumerate(results, 1):
+                if debug:
+                    print(f"Result {i}:")
+                    print(f"  File: {result['id']}")
+                    print(f"  Retrieval score: {result.get('score', 0.0):.3f}")
+                    print(f"  Extension weight: {result.get('extension_weight', 1.0):.3f}")
+                    print(f"  Model weight: {result.get('model_score', 1.0):.3f}")
+                    print(f"  Final score: {result.get('adjusted_score', result.get('score', 0.0)):.3f}")
+                    print(f"  Content length: {len(result['text'])} chars")
+                    print(f"  Content preview: {result['text'][:1000]}...")
+                    print()
+                
+            # Update the context for the next turn
+            meta_parts.append(f"\n\nSearch results:\n{query_part}\n")
+            for i, result in enumerate(results, 1):
+                github_url = get_gh(result['id'])
+                if github_url:
+                    slack_link = f"<{github_url}|{Path(result['id']).name}>"
+                    meta_parts.append(f"\n\nResult {i}:\n")
+                    meta_parts.append(f"  File: {result['id']} ({slack_link})\n")
                 else:
-                    # For natural language queries, expect format: <query> limit N
-                    parts = raw_query.split()
-                    llm_search_max_results = int(parts[-1]) if parts[-1].isdigit() else 5
-                    # Remove the trailing ' limit N' (8 chars) from the end
-                    query_part = raw_query[:-8]
-                    print(f"\nNew search (NL): {query_part} (limit {llm_search_max_results})")
-                    results = rag.search(query_part, limit=llm_search_max_results)
-
-                # Print the new results with score breakdown
-                for i, result in enumerate(results, 1):
-                    if debug:
-                        print(f"Result {i}:")
-                        print(f"  File: {result['id']}")
-                        print(f"  Retrieval score: {result.get('score', 0.0):.3f}")
-                        print(f"  Extension weight: {result.get('extension_weight', 1.0):.3f}")
-                        print(f"  Model weight: {result.get('model_score', 1.0):.3f}")
-                        print(f"  Final score: {result.get('adjusted_score', result.get('score', 0.0)):.3f}")
-                        print(f"  Content length: {len(result['text'])} chars")
-                        print(f"  Content preview: {result['text'][:1000]}...")
-                        print()
-                    
-                # Update the context for the next turn
-                meta_prompt += f"\n\nSearch results:\n{query_part}\n"
-                for i, result in enumerate(results, 1):
-                    github_url = rag._get_github_url(result['id'])
-                    if github_url:
-                        slack_link = f"<{github_url}|{Path(result['id']).name}>"
-                        meta_prompt += f"\n\nResult {i}:\n"
-                        meta_prompt += f"  File: {result['id']} ({slack_link})\n"
-                    else:
-                        meta_prompt += f"\n\nResult {i}:\n"
-                        meta_prompt += f"  File: {result['id']}\n"
-                    meta_prompt += f"  Score: {result.get('score', 0.0):.3f}\n"
-                    meta_prompt += f"  Extension weight: {result.get('extension_weight', 1.0):.3f}\n"
-                    meta_prompt += f"  Model weight: {result.get('model_score', 1.0):.3f}\n"
-                    meta_prompt += f"  Final score: {result.get('adjusted_score', result.get('score', 0.0)):.3f}\n"
-                    meta_prompt += f"  Content length: {len(result['text'])} chars\n"
-                    meta_prompt += f"  Content: {result['text']}"
+                    meta_parts.append(f"\n\nResult {i}:\n")
+                    meta_parts.append(f"  File: {result['id']}\n")
+                meta_parts.append(f"  Score: {result.get('score', 0.0):.3f}\n")
+                meta_parts.append(f"  Extension weight: {result.get('extension_weight', 1.0):.3f}\n")
+                meta_parts.append(f"  Model weight: {result.get('model_score', 1.0):.3f}\n")
+                meta_parts.append(f"  Final score: {result.get('adjusted_score', result.get('score', 0.0)):.3f}\n")
+                meta_parts.append(f"  Content length: {len(result['text'])} chars\n")
+                meta_parts.append(f"  Content: {result['text']}")
 
     # RESPONSE tool handler
     # Extract the comment from the LLM response
     # [BEGIN RESPONSE]
     # <comment>
     # [END RESPONSE]
-    match = re.search(r"\[BEGIN RESPONSE\](.*?)\[END RESPONSE\]", llm_text, re.DOTALL)
+    match = RESPONSE_RE.search(llm_text)
     comment = match.group(1).strip() if match else None
     print(f"\nAssistant response: {comment}")
 
     llm_responses.append(llm_text)
 
     payload["contents"].append({"role": "assistant", "parts": [{"text": assistant_response}]})
+    meta_prompt = "".join(meta_parts)
     payload["contents"].append({"role": "user", "parts": [{"text": meta_prompt}]})
+    # Resend only the initial prompt plus the last few turns (full text is kept in llm_responses)
+    if len(payload["contents"]) > 2 * args.history_turns + 1:
+        payload["contents"] = payload["contents"][:1] + payload["contents"][len(payload["contents"]) - 2 * args.history_turns:]
 
-    if "SEARCH:" not in llm_text and "RETRIEVE:" not in llm_text and "TREE:" not in llm_text and "WEIGHT:" not in llm_text and "RESPONSE" in llm_text:
+    if not (tool_calls["SEARCH"] or tool_calls["RETRIEVE"] or tool_calls["TREE"] or tool_calls["WEIGHT"]) and tool_calls["BEGIN RESPONSE"]:
         searching = False
 
     # AWAIT tool handler
-    if "[AWAIT]" in llm_text:
+    if tool_calls["AWAIT"]:
         searching = False
         print(f"\nAwaiting user input...")
 
     turn += 1
 
+session.close()
+
+# Consolidate this session's weights into the YAML in a single write
+weights_journal.close()
+if weights_journal_path.stat().st_size:
+    with open(model_weights_path, "w") as f:
+        yaml.dump(model_weights, f, Dumper=SafeDumper)
+weights_journal_path.unlink()
+
 print("\n\n\nLLM Responses:")
 for i, response in enumerate(llm_responses, 1):
     print(f"\nResponse {i}:")
@@ -0,0 +1,120 @@
+"""
+Shared fixtures for the test suite.
+Heavy services (embeddings indices, models) are loaded once per session.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+MINILM_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# uint8-quantized ONNX export of the same weights (int8 MatMul), run by txtai's
+# ONNX vectors backend when the path is an .onnx file and onnxruntime is installed
+MINILM_ONNX_MODEL = "Xenova/all-MiniLM-L6-v2/onnx/model_uint8.onnx"
+
+logger = logging.getLogger(__name__)
+
+
+# Code keywords reported per file, collected in a single scan
+KEYWORD_RE = re.compile(r"\b(def|class|function)\b", re.IGNORECASE)
+
+
+async def read_files(paths):
+    """Read files concurrently in worker threads; missing files map to None"""
+    async def read(path):
+        try:
+            return await asyncio.to_thread(Path(path).read_text, encoding='utf-8')
+        except FileNotFoundError:
+            return None
+    return await asyncio.gather(*(read(path) for path in paths))
+
+
+def load_rag():
+    """Load the process-wide RAG service."""
+    # Must be set before txtai/torch are imported
+    os.environ.setdefault('KMP_DUPLICATE_LIB_OK', 'TRUE')
+    os.environ.setdefault('NANCY_BASE_DIR', str(ROOT))
+
+    from bot.plugins.rag.rag_service import get_rag_service
+
+    return get_rag_service()
+
+
+def load_minilm_embeddings():
+    """Create a content-enabled MiniLM Embeddings instance with the model already warmed up."""
+    os.environ.setdefault('KMP_DUPLICATE_LIB_OK', 'TRUE')
+
+    from txtai.embeddings import Embeddings
+
+    try:
+        import onnxruntime  # noqa: F401
+        paths = [MINILM_ONNX_MODEL, MINILM_MODEL]
+    except ImportError:
+        paths = [MINILM_MODEL]
+
+    # Try the ONNX model first; whether this txtai release can load it is only
+    # known by loading it, so fall back to the PyTorch model on any failure
+    for path in paths:
+        try:
+            embeddings = Embeddings({
+                "path": path,
+                "content": True,
+                # Same encode batch size as scripts/build_knowledge_base.py
+                "encodebatch": 64
+            })
+            # The first encode pays model loading and lazy initialisation
+            embeddings.transform("warmup")
+        except Exception as e:
+            if path == MINILM_MODEL:
+                raise
+            logger.warning(f"Could not load {path} ({e}), falling back to {MINILM_MODEL}")
+            continue
+        logger.info(f"MiniLM test model: {path}")
+        return embeddings
+
+
+def load_llm_and_rag():
+    """Load the RAG service and an LLM service that shares it (LLM is None if RAG is unavailable)."""
+    rag = load_rag()
+
+    from bot.plugins.llm.llm_service import LLMService
+
+    if not rag.is_available():
+        return None, rag
+    return LLMService(debugging=True, rag_service=rag), rag
+
+
+@pytest.fixture(scope="session")
+def llm_and_rag():
+    """(LLMService, RAGService) loaded once and shared by every test in the session."""
+    # RAGService degrades to "unavailable" without txtai instead of raising
+    pytest.importorskip("txtai")
+    try:
+        return load_llm_and_rag()
+    except ImportError as e:
+        pytest.skip(f"Bot dependencies not installed: {e}")
+
+
+@pytest.fixture(scope="session")
+def rag_service():
+    """RAGService loaded once and shared by every test in the session."""
+    # RAGService degrades to "unavailable" without txtai instead of raising
+    pytest.importorskip("txtai")
+    try:
+        return load_rag()
+    except ImportError as e:
+        pytest.skip(f"Bot dependencies not installed: {e}")
+
+
+@pytest.fixture(scope="session")
+def minilm_embeddings():
+    """MiniLM Embeddings loaded once and shared by every test in the session
+    (test_simple_retrieval and test_txtai_simple)."""
+    pytest.importorskip("txtai")
+    return load_minilm_embeddings()
@@ -0,0 +1,170 @@
+"""
+Semantic query cache for the RAG tests.
+Repeated and near-duplicate queries reuse the candidate pools of an earlier search.
+"""
+
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Small LRU cache of search candidate pools, keyed by query.
+    
+    Repeating a query always hits. When a similarity threshold is set, a new query
+    whose embedding is at least that cosine-similar to a cached query's reuses the
+    cached candidates too; this costs one encoder pass per miss. A maxsize of 0
+    disables caching entirely.
+    
+    Wrap a RAGService's candidate search with wrap() so its search() calls go
+    through the cache, and fill it up front with prefetch().
+    """
+    
+    def __init__(self, embeddings=None, maxsize: int = 16, threshold: Optional[float] = None):
+        """
+        Args:
+            embeddings: txtai Embeddings used to encode queries for similarity matching
+            maxsize: Maximum number of queries kept (each holds full candidate texts, 0 = disabled)
+            threshold: Minimum cosine similarity for a near-duplicate hit (None = exact only)
+        """
+        self.embeddings = embeddings
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._entries = OrderedDict()  # query -> (vector or None, pool_size, candidates)
+        # Unit-norm query vectors as rows of one float32 matrix, so cosine similarity
+        # against every cached query is a single matrix-vector product
+        self._matrix = None
+        self._matrix_queries = []
+    
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def _encode(self, query: str):
+        return self._normalize(self.embeddings.transform(query))
+    
+    def _add_row(self, query: str, vector):
+        if query in self._matrix_queries:
+            self._matrix[self._matrix_queries.index(query)] = vector
+        elif self._matrix is None:
+            self._matrix = vector[np.newaxis, :].copy()
+            self._matrix_queries.append(query)
+        else:
+            self._matrix = np.vstack([self._matrix, vector])
+            self._matrix_queries.append(query)
+    
+    def _drop_row(self, query: str):
+        if query in self._matrix_queries:
+            row = self._matrix_queries.index(query)
+            self._matrix = np.delete(self._matrix, row, axis=0)
+            self._matrix_queries.pop(row)
+    
+    def _nearest(self, vector) -> Optional[str]:
+        """Return the cached query most similar to (unit-norm) vector, if it meets the threshold."""
+        if not self._matrix_queries:
+            return None
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._matrix_queries[best] if scores[best] >= self.threshold else None
+    
+    def fetch(self, query: str, pool_size: int, compute: Callable) -> tuple:
+        """
+        Return the candidate pools for query, computing and caching them on a miss.
+        
+        Args:
+            query: Search query
+            pool_size: Number of candidates needed from each index
+            compute: compute(query, pool_size) -> tuple of score-sorted result lists (or None)
+            
+        Returns:
+            Tuple of candidate lists, each truncated to pool_size
+        """
+        if not self.maxsize:
+            return compute(query, pool_size)
+        
+        semantic = self.threshold is not None and self.embeddings is not None
+        key, vector = query, None
+        entry = self._entries.get(query)
+        if entry is None and semantic:
+            vector = self._encode(query)
+            key = self._nearest(vector)
+            entry = self._entries.get(key) if key is not None else None
+        
+        # A larger cached pool already contains the top pool_size candidates
+        if entry is not None and entry[1] >= pool_size:
+            self._entries.move_to_end(key)
+            return tuple(pool[:pool_size] if pool is not None else None for pool in entry[2])
+        
+        candidates = compute(query, pool_size)
+        if entry is not None and key == query:
+            vector = entry[0]
+        self.store(query, pool_size, candidates, vector)
+        return candidates
+    
+    def store(self, query: str, pool_size: int, candidates: tuple, vector=None):
+        """
+        Cache candidate pools computed elsewhere (e.g. by a batched search).
+        
+        Args:
+            query: Search query
+            pool_size: Number of candidates each pool was searched with
+            candidates: Tuple of score-sorted result lists (or None)
+            vector: Query embedding, if already computed
+        """
+        if not self.maxsize:
+            return
+        if vector is None and self.threshold is not None and self.embeddings is not None:
+            vector = self._encode(query)
+        elif vector is not None:
+            vector = self._normalize(vector)
+        if vector is not None:
+            self._add_row(query, vector)
+        self._entries[query] = (vector, pool_size, candidates)
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._drop_row(evicted)
+    
+    def clear(self):
+        """Drop every cached query."""
+        self._entries.clear()
+        self._matrix = None
+        self._matrix_queries = []
+    
+    def wrap(self, compute: Callable) -> Callable:
+        """Return compute(query, pool_size) with its results served from this cache."""
+        return lambda query, pool_size: self.fetch(query, pool_size, compute)
+
+
+def prefetch(rag, cache: SemanticCache, queries: List[str], limit: int = 5) -> None:
+    """
+    Search several queries on a RAGService's indices in one batched pass and cache
+    their candidates, so later search() calls for them (with up to the same limit)
+    skip the encoder and ANN lookups entirely.
+    
+    Args:
+        rag: RAGService whose indices are searched
+        cache: Cache wrapped around rag's candidate search
+        queries: Search queries
+        limit: Largest result limit the queries will be searched with
+    """
+    # RAGService searches limit*50 candidates per index before reweighting
+    pool_size = limit * 50
+    # batchsearch encodes all queries in one forward pass per model
+    general_batches = rag.general_embeddings.batchsearch(queries, pool_size)
+    if rag.use_dual_embedding and rag.code_embeddings:
+        code_batches = rag.code_embeddings.batchsearch(queries, pool_size)
+    else:
+        code_batches = [None] * len(queries)
+    
+    # Similarity matching needs the query vectors as well: one more batched pass
+    vectors = [None] * len(queries)
+    if cache.threshold is not None:
+        vectors = np.asarray(rag.general_embeddings.batchtransform(queries), dtype=np.float32)
+    
+    for query, general_results, code_results, vector in zip(queries, general_batches, code_batches, vectors):
+        cache.store(query, pool_size, (general_results, code_results), vector)
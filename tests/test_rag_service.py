@@ -3,77 +3,113 @@
 Test script for the RAG service.
 """
 
-import os
+import io
 import sys
-from pathlib import Path
 
-# Add the bot directory to the path (now relative to tests/)
-sys.path.insert(0, str(Path(__file__).parent.parent / "bot"))
+import pytest
 
-def test_rag_service():
+def test_rag_service(rag_service, monkeypatch):
     """Test the RAG service functionality."""
     
-    # Set the environment variable for OpenMP
-    os.environ['KMP_DUPLICATE_LIB_OK'] = 'TRUE'
-    
     print("=== Testing RAG Service ===\n")
     
-    try:
-        from plugins.rag.rag_service import RAGService
-        
-        # Get the RAG service
-        rag = RAGService()
-        
-        # Check if embeddings exist instead of is_available()
-        if not hasattr(rag, 'embeddings') or rag.embeddings is None:
-            print("❌ RAG service not available")
-            print("Make sure to run the knowledge base build first:")
-            print("python scripts/build_knowledge_base.py --category microlens_submit --dirty")
-            return False
+    rag = rag_service
+    
+    assert rag.is_available(), (
+        "RAG service not available. Make sure to run the knowledge base build first: "
+        "python scripts/build_knowledge_base.py --category microlens_submit --dirty"
+    )
+    
+    print("✅ RAG service loaded successfully\n")
+    
+    # Test queries
+    test_queries = [
+        "submission validation",
+        "submission dossier",
+        "parameter validation",
+        "CLI commands"
+    ]
+    
+    # Route this test's searches through a semantic cache (near-duplicate queries share
+    # candidates too); monkeypatch restores the session-wide service afterwards
+    from semantic_cache import SemanticCache, prefetch
+    cache = SemanticCache(rag.general_embeddings, maxsize=len(test_queries), threshold=0.95)
+    monkeypatch.setattr(rag, "_search_candidates", cache.wrap(rag._search_candidates))
+    
+    # Encode and search every test query in one batch; the calls below reuse the cached candidates
+    prefetch(rag, cache, test_queries, limit=5)
+    
+    for query in test_queries:
+        print(f"Query: '{query}'")
         
-        print("✅ RAG service loaded successfully\n")
+        # Search once; results, context and AI-ready views all come from that search
+        views = rag.search_all(query, limit=5)
         
-        # Test queries
-        test_queries = [
-            "submission validation",
-            "submission dossier",
-            "parameter validation",
-            "CLI commands"
-        ]
+        # Test search
+        results = views['results']
+        assert results, f"No results for {query!r}"
+        print(f"  Found {len(results)} results:")
+        # Collect the per-result lines and write them in one go
+        buf = io.StringIO()
+        for i, result in enumerate(results, 1):
+            preview = result['text'][:200]
+            buf.write(f"    {i}. {result['id']} (score: {result['score']:.3f})\n")
+            buf.write(f"       {preview}...\n")
+        sys.stdout.write(buf.getvalue())
         
-        for query in test_queries:
-            print(f"Query: '{query}'")
-            
-            # Test search
-            results = rag.search(query, limit=5)
-            print(f"  Found {len(results)} results:")
-            for i, result in enumerate(results, 1):
-                print(f"    {i}. {result['id']} (score: {result['score']:.3f})")
-                print(f"       {result['text'][:2000]}...")
-            
-            # Test context
-            context = rag.get_context_for_query(query)
-            print(f"  Context length: {len(context)} chars")
-            print(f"  Context preview: {context[:2000]}...")
-            
-            # Test AI-ready results
-            ai_results = rag.get_raw_results_for_ai(query, limit=1)
-            if ai_results:
-                print(f"  AI-ready result:")
-                print(f"    GitHub URL: {ai_results[0].get('github_url', 'N/A')}")
-                print(f"    Content length: {len(ai_results[0]['text'])} chars")
-            
-            print()
+        # Test context
+        context = views['context']
+        assert context, f"Empty context for {query!r}"
+        print(f"  Context length: {len(context)} chars")
+        context_preview = context[:200]
+        print(f"  Context preview: {context_preview}...")
         
-        print("✅ All tests passed!")
-        return True
+        # Test AI-ready results
+        ai_results = views['ai_results']
+        assert ai_results[0]['id'] == results[0]['id']
+        print(f"  AI-ready result:")
+        print(f"    GitHub URL: {ai_results[0].get('github_url', 'N/A')}")
+        print(f"    Content length: {len(ai_results[0]['text'])} chars")
         
-    except Exception as e:
-        print(f"❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+        print()
+    
+    print("✅ All tests passed!")
+
+
+class _FakeEncoder:
+    """Stands in for txtai Embeddings.transform with fixed query vectors."""
+    
+    vectors = {
+        "submission validation": [1.0, 0.0, 0.0],
+        "validate a submission": [0.98, 0.2, 0.0],
+        "CLI commands": [0.0, 1.0, 0.0],
+        "plotting": [0.0, 0.0, 3.0],
+    }
+    
+    def transform(self, query):
+        return self.vectors[query]
 
-if __name__ == "__main__":
-    success = test_rag_service()
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+
+def test_semantic_cache_reuses_near_duplicate_queries():
+    """Similar queries share cached candidates; eviction keeps the vector matrix in step."""
+    pytest.importorskip("numpy")
+    from semantic_cache import SemanticCache
+    
+    searched = []
+    def compute(query, pool_size):
+        searched.append(query)
+        return ([query] * pool_size, None)
+    
+    cache = SemanticCache(_FakeEncoder(), maxsize=2, threshold=0.95)
+    assert cache.fetch("submission validation", 3, compute) == (["submission validation"] * 3, None)
+    # Cosine ~0.98 to the cached query: served from its (larger) pool without searching
+    assert cache.fetch("validate a submission", 2, compute) == (["submission validation"] * 2, None)
+    assert cache.fetch("CLI commands", 2, compute) == (["CLI commands"] * 2, None)
+    assert searched == ["submission validation", "CLI commands"]
+    
+    # Evicts "submission validation" along with its matrix row
+    cache.fetch("plotting", 2, compute)
+    assert cache._matrix_queries == ["CLI commands", "plotting"]
+    assert cache._matrix.shape == (2, 3)
+    cache.fetch("validate a submission", 2, compute)
+    assert searched[-1] == "validate a submission"
@@ -3,76 +3,67 @@
 Simple test script to verify txtai retrieval works.
 """
 
-import os
+import io
 import sys
-from pathlib import Path
-import traceback
+import time
 
-# Add the bot directory to the path (now relative to tests/)
-sys.path.insert(0, str(Path(__file__).parent.parent / "bot"))
+import pytest
 
 def test_txtai_import():
     """Test if txtai can be imported"""
     print("Testing txtai import...")
     
-    try:
-        print("Attempting to import txtai.embeddings...")
-        from txtai.embeddings import Embeddings
-        print("✅ txtai.embeddings import successful!")
-        return True
-    except Exception as e:
-        print(f"❌ txtai.embeddings import failed: {e}")
-        print("Full traceback:")
-        traceback.print_exc()
-        return False
+    # Skip when txtai isn't installed at all; a broken install still fails the import below
+    pytest.importorskip("txtai")
+    print("Attempting to import txtai.embeddings...")
+    from txtai.embeddings import Embeddings
+    assert Embeddings is not None
+    print("✅ txtai.embeddings import successful!")
 
-def test_simple_embeddings():
+def test_simple_embeddings(minilm_embeddings):
     """Test basic embeddings functionality"""
     print("\nTesting basic embeddings functionality...")
     
-    try:
-        from txtai.embeddings import Embeddings
-        
-        # Create a simple embeddings instance
-        embeddings = Embeddings({
-            "path": "sentence-transformers/all-MiniLM-L6-v2",
-            "content": True
-        })
-        
-        # Test with simple data
-        documents = [
-            ("doc1", "This is a test document about microlensing", None),
-            ("doc2", "Another document about gravitational lensing", None),
-            ("doc3", "A third document about astronomy", None)
-        ]
-        
-        print("Indexing test documents...")
-        embeddings.index(documents)
-        
-        print("Testing search...")
-        results = embeddings.search("microlensing", 2)
-        
-        print("Search results:")
-        for result in results:
-            print(f"  - {result['id']}: {result['text']}")
-        
-        print("✅ Basic embeddings functionality works!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Basic embeddings test failed: {e}")
-        print("Full traceback:")
-        traceback.print_exc()
-        return False
+    # Shared session instance, already warmed up so the timings below exclude model loading
+    embeddings = minilm_embeddings
+    
+    # Test with simple data, streamed so txtai can index in batches
+    def documents():
+        yield ("doc1", "This is a test document about microlensing", None)
+        yield ("doc2", "Another document about gravitational lensing", None)
+        yield ("doc3", "A third document about astronomy", None)
+    
+    print("Indexing test documents...")
+    start = time.perf_counter()
+    embeddings.index(documents())
+    print(f"Indexed in {time.perf_counter() - start:.3f}s")
+    
+    print("Testing search...")
+    start = time.perf_counter()
+    results = embeddings.search("microlensing", 2)
+    print(f"Searched in {time.perf_counter() - start:.3f}s")
+    
+    buf = io.StringIO()
+    buf.write("Search results:\n")
+    for result in results:
+        buf.write(f"  - {result['id']}: {result['text']}\n")
+    sys.stdout.write(buf.getvalue())
+    
+    assert results and results[0]['id'] == "doc1"
+    print("✅ Basic embeddings functionality works!")
 
 if __name__ == "__main__":
     print("=== txtai Import Test ===\n")
     
-    if test_txtai_import():
-        test_simple_embeddings()
-    else:
-        print("\n❌ Cannot proceed without txtai import")
+    try:
+        from txtai.embeddings import Embeddings
+    except ImportError as e:
+        print(f"\n❌ Cannot proceed without txtai import: {e}")
         print("\nTroubleshooting suggestions:")
         print("1. Try: pip install --upgrade transformers")
         print("2. Try: pip install --upgrade txtai")
-        print("3. Check if there are conflicting local installations") 
\ No newline at end of file
+        print("3. Check if there are conflicting local installations")
+    else:
+        test_txtai_import()
+        from conftest import load_minilm_embeddings
+        test_simple_embeddings(load_minilm_embeddings())
@@ -3,10 +3,15 @@
 Direct test to show that txtai can handle raw files without preprocessing
 """
 
-import os
+import asyncio
 from pathlib import Path
 
-def analyze_raw_files():
+from conftest import KEYWORD_RE, read_files
+
+# Flattens whitespace control characters so a preview prints on one line
+PREVIEW_TRANS = str.maketrans("\n\r\t", "   ")
+
+async def analyze_raw_files():
     """Analyze raw files to show they're ready for txtai"""
     
     test_files = [
@@ -23,19 +28,19 @@ def analyze_raw_files():
     print("4. No complex chunking needed\n")
     
     total_chars = 0
-    for file_path in test_files:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                total_chars += len(content)
-                
-                print(f"📄 {file_path}")
-                print(f"   Size: {len(content):,} characters")
-                print(f"   Type: {Path(file_path).suffix}")
-                print(f"   Functions: {'def' in content}")
-                print(f"   Classes: {'class' in content}")
-                print(f"   Sample: {content[:100].replace(chr(10), ' ')}...")
-                print()
+    contents = await read_files(test_files)
+    for file_path, content in zip(test_files, contents):
+        if content is not None:
+            total_chars += len(content)
+            keywords = {match.lower() for match in KEYWORD_RE.findall(content)}
+            
+            print(f"📄 {file_path}")
+            print(f"   Size: {len(content):,} characters")
+            print(f"   Type: {Path(file_path).suffix}")
+            print(f"   Functions: {'def' in keywords}")
+            print(f"   Classes: {'class' in keywords}")
+            print(f"   Sample: {content[:100].translate(PREVIEW_TRANS)}...")
+            print()
         else:
             print(f"❌ File not found: {file_path}\n")
     
@@ -50,4 +55,4 @@ def analyze_raw_files():
     print("\nThe complex pyragify preprocessing pipeline may be unnecessary!")
 
 if __name__ == "__main__":
-    analyze_raw_files() 
\ No newline at end of file
+    asyncio.run(analyze_raw_files()) 
\ No newline at end of file
@@ -3,26 +3,22 @@
 Simple test to see if txtai can handle raw files directly
 """
 
-import os
-from pathlib import Path
+import asyncio
+
+from conftest import KEYWORD_RE, read_files
 
 try:
-    from txtai.embeddings import Embeddings
+    import txtai  # noqa: F401
     TXTAI_AVAILABLE = True
 except ImportError:
     print("txtai not available, testing with simple text processing instead")
     TXTAI_AVAILABLE = False
 
-def test_txtai_raw_files():
+def test_txtai_raw_files(minilm_embeddings):
     """Test if txtai can handle raw files directly"""
     
-    if not TXTAI_AVAILABLE:
-        print("Testing with simple text processing...")
-        test_simple_text_processing()
-        return
-    
-    # Create embeddings instance
-    embeddings = Embeddings({"path": "sentence-transformers/all-MiniLM-L6-v2", "content": True})
+    # Session-wide MiniLM instance from conftest (index() below replaces any previous contents)
+    embeddings = minilm_embeddings
     
     # Test with actual files from our knowledge base
     test_files = [
@@ -32,13 +28,12 @@ def test_txtai_raw_files():
     ]
     
     documents = []
-    for file_path in test_files:
-        if os.path.exists(file_path):
-            print(f"Reading {file_path}")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                documents.append((file_path, content, None))
-                print(f"  - Length: {len(content)} chars")
+    contents = asyncio.run(read_files(test_files))
+    for file_path, content in zip(test_files, contents):
+        if content is not None:
+            print(f"Read {file_path}")
+            documents.append((file_path, content, None))
+            print(f"  - Length: {len(content)} chars")
     
     if documents:
         print(f"\nIndexing {len(documents)} documents...")
@@ -60,18 +55,23 @@ def test_simple_text_processing():
         "knowledge_base/raw/microlens_submit/microlens-submit/agents.md"
     ]
     
-    for file_path in test_files:
-        if os.path.exists(file_path):
+    contents = asyncio.run(read_files(test_files))
+    for file_path, content in zip(test_files, contents):
+        if content is not None:
             print(f"\n=== {file_path} ===")
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(f"Length: {len(content)} chars")
-                print(f"First 200 chars: {content[:200]}...")
-                print(f"Contains 'function': {'function' in content.lower()}")
-                print(f"Contains 'class': {'class' in content.lower()}")
-                print(f"Contains 'def': {'def' in content.lower()}")
+            keywords = {match.lower() for match in KEYWORD_RE.findall(content)}
+            print(f"Length: {len(content)} chars")
+            print(f"First 200 chars: {content[:200]}...")
+            print(f"Contains 'function': {'function' in keywords}")
+            print(f"Contains 'class': {'class' in keywords}")
+            print(f"Contains 'def': {'def' in keywords}")
         else:
             print(f"File not found: {file_path}")
 
 if __name__ == "__main__":
-    test_txtai_raw_files() 
\ No newline at end of file
+    if TXTAI_AVAILABLE:
+        from conftest import load_minilm_embeddings
+        test_txtai_raw_files(load_minilm_embeddings())
+    else:
+        print("Testing with simple text processing...")
+        test_simple_text_processing()